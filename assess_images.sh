@@ -49,34 +49,38 @@ mkdir -p results
 # Function to evaluate images
 evaluate_images() {
     local model_type=$1
+    local weights_name=""
     local weights_file=""
     
     if [ "$model_type" == "aesthetic" ]; then
-        weights_file="/models/weights_mobilenet_aesthetic_0.07.hdf5"
+        weights_name="weights_mobilenet_aesthetic_0.07"
         echo -e "\n===== Evaluating AESTHETIC quality of images in $IMAGE_DIR ====="
     else
-        weights_file="/models/weights_mobilenet_technical_0.11.hdf5"
+        weights_name="weights_mobilenet_technical_0.11"
         echo -e "\n===== Evaluating TECHNICAL quality of images in $IMAGE_DIR ====="
     fi
     
-    # Process each image
-    for img in "$IMAGE_DIR"/*; do
-        if [[ $img =~ \.(jpg|jpeg|png)$ ]]; then
-            echo -e "\nEvaluating: $(basename "$img")"
-            
-            # Run the Docker container with TensorFlow directly
-            docker run --rm \
-                -v "$(pwd)/$IMAGE_DIR:/images" \
-                -v "$(pwd)/models/MobileNet:/models" \
-                -v "$(pwd)/results:/results" \
-                -v "$(pwd)/predict_script.py:/predict_script.py" \
-                tensorflow/tensorflow:2.9.1 \
-                python3 /predict_script.py \
-                --image-path "/images/$(basename "$img")" \
-                --weights-file "$weights_file" \
-                --model-type "$model_type"
+    # Prefer a model converted with convert_model.py, it loads much faster
+    weights_file="/models/${weights_name}.hdf5"
+    for suffix in _int8.tflite .tflite _savedmodel; do
+        if [ -e "models/MobileNet/${weights_name}${suffix}" ]; then
+            weights_file="/models/${weights_name}${suffix}"
+            break
         fi
     done
+    
+    # Evaluate every image in a single container run so TensorFlow and
+    # the model weights are only loaded once per model type
+    docker run --rm \
+        -v "$(pwd)/$IMAGE_DIR:/images" \
+        -v "$(pwd)/models/MobileNet:/models" \
+        -v "$(pwd)/results:/results" \
+        -v "$(pwd)/predict_script.py:/predict_script.py" \
+        tensorflow/tensorflow:2.9.1 \
+        python3 /predict_script.py \
+        --image-dir /images \
+        --weights-file "$weights_file" \
+        --model-type "$model_type"
 }
 
 # Main execution
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Convert the NIMA HDF5 weights into a faster-loading inference artifact.
+Run this once inside the TensorFlow container; predict_script.py picks the
+converted model up automatically when it is passed as --weights-file.
+"""
+
+import os
+import argparse
+import numpy as np
+from keras.models import load_model
+from keras.preprocessing.image import load_img, img_to_array
+import tensorflow as tf
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+# Number of images used to calibrate the int8 activation ranges
+CALIBRATION_IMAGES = 100
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Convert NIMA HDF5 weights to a SavedModel or TFLite model')
+    parser.add_argument('--weights-file', type=str, required=True,
+                        help='HDF5 weights file to convert')
+    parser.add_argument('--format', type=str, default='savedmodel',
+                        choices=['savedmodel', 'tflite'],
+                        help='Output format (default: savedmodel)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Output path (default: next to the weights file)')
+    parser.add_argument('--quantize', action='store_true',
+                        help='Quantize weights and activations to int8 (implies --format tflite)')
+    parser.add_argument('--calibration-dir', type=str, default='sample_images',
+                        help='Images used to calibrate int8 quantization (default: sample_images)')
+    return parser.parse_args()
+
+def default_output_path(weights_file, output_format, quantize=False):
+    """Derive the output path from the weights file name."""
+    stem = os.path.splitext(weights_file)[0]
+    if quantize:
+        return f"{stem}_int8.tflite"
+    if output_format == 'tflite':
+        return f"{stem}.tflite"
+    return f"{stem}_savedmodel"
+
+def convert_savedmodel(model, output_path):
+    """Save the model as a TensorFlow SavedModel directory."""
+    model.save(output_path, save_format='tf')
+
+def convert_tflite(model, output_path):
+    """Save the model as a TFLite flatbuffer."""
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+
+def representative_dataset(calibration_dir):
+    """Yield preprocessed calibration images for int8 range estimation."""
+    image_names = sorted(name for name in os.listdir(calibration_dir)
+                         if name.lower().endswith(IMAGE_EXTENSIONS))
+    for name in image_names[:CALIBRATION_IMAGES]:
+        try:
+            img = load_img(os.path.join(calibration_dir, name), target_size=(224, 224))
+        except OSError:
+            print(f"Warning: Could not read calibration image '{name}', skipping.")
+            continue
+        x = img_to_array(img) / 255.
+        yield [x[None, ...].astype(np.float32)]
+
+def convert_tflite_int8(model, output_path, calibration_dir):
+    """Save the model as a fully int8-quantized TFLite flatbuffer."""
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = lambda: representative_dataset(calibration_dir)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.uint8
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+
+def main():
+    """Main function."""
+    args = parse_args()
+    output_path = args.output or default_output_path(args.weights_file, args.format, args.quantize)
+    
+    model = load_model(args.weights_file)
+    
+    if args.quantize:
+        convert_tflite_int8(model, output_path, args.calibration_dir)
+    elif args.format == 'tflite':
+        convert_tflite(model, output_path)
+    else:
+        convert_savedmodel(model, output_path)
+    
+    print(f"Saved converted model to {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,51 @@ import re
 import subprocess
 from collections import defaultdict
 
+try:
+    # orjson is a much faster drop-in for the json module when installed
+    import orjson
+except ImportError:
+    orjson = None
+
+# Prefix of the structured result lines printed by predict_script.py
+JSON_PREFIX = "NIMA_JSON "
+# Consolidated results file read by visualize_results.py
+INDEX_FILE = "_all.json"
+# Suffix of the per-image, per-model result files written by predict_script.py
+RESULTS_SUFFIX = "_results.json"
+# Buffer size for reading the assessment output pipe
+PIPE_BUFFER_SIZE = 65536
+
+# Pattern to match score distributions
+_SCORE_RE = re.compile(r"Predicted score distribution: \[([\d\.\s,]+)\]")
+# Pattern to match image file names
+_IMAGE_RE = re.compile(r"Evaluating: ([\w\.\-]+)")
+# Pattern to match model type
+_MODEL_RE = re.compile(r"===== Evaluating (\w+) quality")
+
+def dumps_json(obj, indent=False):
+    """Serialize an object to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode()
+
+def loads_json(text):
+    """Parse a JSON string."""
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+def load_json(path):
+    """Load a JSON file."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def iter_results(results_dir):
+    """Yield the paths of the JSON result files in the results directory."""
+    with os.scandir(results_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith(".json") and entry.is_file(follow_symlinks=False):
+                yield entry.path
+
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Parse NIMA assessment results and prepare for visualization')
@@ -22,58 +67,83 @@ def parse_args():
                         help='Model type to parse results for (default: both)')
     return parser.parse_args()
 
-def run_assessment(image_dir, model_type):
-    """Run the assessment script and capture its output."""
+def stream_assessment(image_dir, model_type):
+    """Run the assessment script and yield its output line by line."""
     cmd = ['./assess_images.sh']
     if model_type != 'both':
         cmd.append(f'--{model_type}')
     if image_dir != 'sample_images':
         cmd.append('--custom')
     
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        print(f"Error running assessment: {e}")
-        print(f"STDOUT: {e.stdout}")
-        print(f"STDERR: {e.stderr}")
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True, bufsize=PIPE_BUFFER_SIZE)
+    yield from process.stdout
+    
+    return_code = process.wait()
+    if return_code != 0:
+        print(f"Error running assessment: {cmd[0]} exited with code {return_code}")
         sys.exit(1)
 
-def parse_results(output_text):
-    """Parse the output text to extract score distributions."""
+def parse_results_stream(lines):
+    """Parse output lines as they arrive to extract score distributions."""
     results = defaultdict(dict)
-    
-    # Pattern to match score distributions
-    score_pattern = r"Predicted score distribution: \[([\d\.\s,]+)\]"
-    # Pattern to match image file names
-    image_pattern = r"Evaluating: ([\w\.\-]+)"
-    # Pattern to match model type
-    model_pattern = r"===== Evaluating (\w+) quality"
+    legacy_results = defaultdict(dict)
     
     current_image = None
     current_model = None
     
-    for line in output_text.split('\n'):
+    for line in lines:
+        if line.startswith(JSON_PREFIX):
+            record = loads_json(line[len(JSON_PREFIX):])
+            results[record['image']][record['model_type']] = record['scores']
+            continue
+        
+        # Human-readable lines only matter for output from older predictor
+        # versions, which print no structured lines at all
+        if results:
+            continue
+        
+        # Cheap substring check before running any regex
+        if "Evaluating" not in line and "Predicted score" not in line:
+            continue
+        
         # Check for model type
-        model_match = re.search(model_pattern, line)
+        model_match = _MODEL_RE.search(line)
         if model_match:
             current_model = model_match.group(1).lower()
             continue
         
         # Check for image file
-        image_match = re.search(image_pattern, line)
+        image_match = _IMAGE_RE.search(line)
         if image_match:
             current_image = image_match.group(1)
             continue
         
         # Check for score distribution
-        score_match = re.search(score_pattern, line)
+        score_match = _SCORE_RE.search(line)
         if score_match and current_image and current_model:
             score_str = score_match.group(1)
             scores = [float(s.strip()) for s in score_str.split(',')]
-            results[current_image][current_model] = scores
+            legacy_results[current_image][current_model] = scores
     
-    return results
+    return results or legacy_results
+
+def parse_results(output_text):
+    """Parse the output text to extract score distributions."""
+    return parse_results_stream(output_text.splitlines())
+
+def save_index(results, output_dir='results'):
+    """Merge the results into the consolidated index file."""
+    index_file = os.path.join(output_dir, INDEX_FILE)
+    index = {}
+    if os.path.exists(index_file):
+        index = load_json(index_file)
+    
+    for image, models in results.items():
+        index.setdefault(image, {}).update(models)
+    
+    with open(index_file, 'wb') as f:
+        f.write(dumps_json(index))
+    return index_file
 
 def save_results(results, output_dir='results'):
     """Save the parsed results to JSON files."""
@@ -82,19 +152,21 @@ def save_results(results, output_dir='results'):
     
     for image, models in results.items():
         output_file = os.path.join(output_dir, f"{os.path.splitext(image)[0]}_scores.json")
-        with open(output_file, 'w') as f:
-            json.dump(models, f, indent=2)
+        with open(output_file, 'wb') as f:
+            f.write(dumps_json(models, indent=True))
         print(f"Saved results for {image} to {output_file}")
+    
+    # A single index lets the visualizer read everything with one file open
+    index_file = save_index(results, output_dir)
+    print(f"Saved results index to {index_file}")
 
 def main():
     """Main function."""
     args = parse_args()
     
     print(f"Running assessment for {args.model_type} model(s) on images in {args.image_dir}...")
-    output = run_assessment(args.image_dir, args.model_type)
-    
-    print("Parsing results...")
-    results = parse_results(output)
+    # Parse the output while the assessment is still running
+    results = parse_results_stream(stream_assessment(args.image_dir, args.model_type))
     
     if not results:
         print("No results found. Check if the assessment ran correctly.")
@@ -2,67 +2,219 @@
 
 import os
 import sys
+import glob
 import json
 import argparse
 import numpy as np
 from keras.models import load_model
-from keras.preprocessing.image import load_img, img_to_array
+from PIL import Image
 import tensorflow as tf
 
+try:
+    # orjson serializes numpy arrays natively and is much faster than json
+    import orjson
+except ImportError:
+    orjson = None
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+BATCH_SIZE = 32
+# Prefix for the machine-readable result lines picked up by parse_results.py
+JSON_PREFIX = "NIMA_JSON "
+# Rating levels the model predicts a distribution over
+_BINS = np.arange(1, 11, dtype=np.float32)
+
+def _to_builtin(obj):
+    # Fallback serializer for numpy values when orjson is not installed
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps_json(obj, indent=False):
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, indent=2 if indent else None, default=_to_builtin).encode()
+
 def parse_args():
     parser = argparse.ArgumentParser()
-    parser.add_argument('--image-path', type=str, required=True)
+    images = parser.add_mutually_exclusive_group(required=True)
+    images.add_argument('--image-paths', '--image-path', type=str, nargs='+', dest='image_paths')
+    images.add_argument('--image-dir', type=str)
+    images.add_argument('--server', action='store_true',
+                        help='Read image paths from stdin and write one JSON result per line to stdout')
     parser.add_argument('--weights-file', type=str, required=True)
     parser.add_argument('--model-type', type=str, choices=['aesthetic', 'technical'], required=True)
     return parser.parse_args()
 
+def collect_image_paths(args):
+    if args.image_paths:
+        # Expand any glob patterns passed through unquoted by the caller
+        paths = []
+        for pattern in args.image_paths:
+            paths.extend(sorted(glob.glob(pattern)) or [pattern])
+        return paths
+    return sorted(
+        os.path.join(args.image_dir, name)
+        for name in os.listdir(args.image_dir)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
 def process_image(image_path, target_size=(224, 224)):
-    # Load and resize image
-    img = load_img(image_path, target_size=target_size)
-    # Convert to array and rescale
-    x = img_to_array(img)
-    x /= 255.
+    # Load and resize image with the same nearest-neighbour filter as keras' load_img
+    with Image.open(image_path) as img:
+        img = img.convert('RGB').resize((target_size[1], target_size[0]), Image.NEAREST)
+    # Keep raw uint8 pixels; rescaling to [0, 1] happens in the predictor
+    x = np.asarray(img, dtype=np.uint8)
     # Add batch dimension
-    x = np.expand_dims(x, axis=0)
-    return x
+    return x[None, ...]
 
-def predict(model, image, image_path):
-    # Get prediction
-    scores = model.predict(image)[0]
-    # Calculate mean score
-    mean_score = np.sum(scores * np.arange(1, 11))
-    # Print results
-    print(f"\nImage: {os.path.basename(image_path)}")
-    print(f"Predicted score: {mean_score:.2f}")
-    print(f"Predicted score distribution: {scores.tolist()}")
-    return scores, mean_score
+def rescale(images):
+    # Rescale uint8 pixels to the [0, 1] float input the models were trained on
+    return images.astype(np.float32) * np.float32(1. / 255.)
 
-def main():
-    args = parse_args()
+def load_predictor(weights_file):
+    # Return a function mapping a (N, 224, 224, 3) uint8 batch to score distributions.
+    # Converted models from convert_model.py skip the HDF5 graph reconstruction.
+    if weights_file.endswith('.tflite'):
+        interpreter = tf.lite.Interpreter(model_path=weights_file, num_threads=os.cpu_count())
+        interpreter.allocate_tensors()
+        input_details = interpreter.get_input_details()[0]
+        output_details = interpreter.get_output_details()[0]
+        
+        def predict_tflite(images):
+            images = rescale(images)
+            # Int8-quantized models take uint8 input; map the [0, 1] pixels
+            # onto the model's own quantization grid
+            if input_details['dtype'] == np.uint8:
+                scale, zero_point = input_details['quantization']
+                images = np.clip(np.round(images / scale + zero_point), 0, 255).astype(np.uint8)
+            scores = []
+            for image in images:
+                interpreter.set_tensor(input_details['index'], image[None, ...])
+                interpreter.invoke()
+                scores.append(interpreter.get_tensor(output_details['index'])[0])
+            scores = np.stack(scores)
+            if output_details['dtype'] != np.float32:
+                scale, zero_point = output_details['quantization']
+                scores = (scores.astype(np.float32) - zero_point) * scale
+            return scores
+        return predict_tflite
     
-    # Load model
-    model = load_model(args.weights_file)
+    if os.path.isdir(weights_file):
+        model = tf.saved_model.load(weights_file)
+        output_name = next(iter(model.signatures['serving_default'].structured_outputs))
+        
+        def predict_savedmodel(images):
+            # Look the signature up through the loaded object so its variables stay alive
+            infer = model.signatures['serving_default']
+            return infer(tf.constant(rescale(images)))[output_name].numpy()
+        return predict_savedmodel
     
-    # Process image
-    image = process_image(args.image_path)
+    model = load_model(weights_file)
     
-    # Make prediction
-    scores, mean_score = predict(model, image, args.image_path)
+    # Trace rescaling and inference into one XLA-compiled graph with a fixed
+    # input signature, so repeated calls skip Python dispatch and retracing
+    @tf.function(input_signature=[tf.TensorSpec((None, 224, 224, 3), tf.uint8)], jit_compile=True)
+    def infer(images):
+        return model(tf.cast(images, tf.float32) * (1. / 255.), training=False)
     
-    # Save results to file
-    base_filename = os.path.splitext(os.path.basename(args.image_path))[0]
+    def predict_keras(images):
+        return np.concatenate([infer(images[i:i + BATCH_SIZE]).numpy()
+                               for i in range(0, len(images), BATCH_SIZE)])
+    return predict_keras
+
+def predict(predictor, images, image_paths, model_type):
+    # Get predictions for the whole batch in one call
+    scores_batch = predictor(images)
+    # Calculate mean scores as a single matrix-vector product
+    mean_scores = scores_batch @ _BINS
+    # Print results
+    for image_path, scores, mean_score in zip(image_paths, scores_batch, mean_scores):
+        print(f"\nEvaluating: {os.path.basename(image_path)}")
+        print(f"Image: {os.path.basename(image_path)}")
+        print(f"Predicted score: {mean_score:.2f}")
+        print(f"Predicted score distribution: {scores.tolist()}")
+        record = {"image": os.path.basename(image_path), "model_type": model_type, "scores": scores}
+        print(JSON_PREFIX + dumps_json(record).decode(), flush=True)
+    return scores_batch, mean_scores
+
+def save_result(image_path, model_type, scores, mean_score, output_dir="/results"):
+    base_filename = os.path.splitext(os.path.basename(image_path))[0]
     results = {
-        "image": os.path.basename(args.image_path),
-        "model_type": args.model_type,
+        "image": os.path.basename(image_path),
+        "model_type": model_type,
         "mean_score": float(mean_score),
-        "scores": scores.tolist()
+        "scores": scores
     }
     
-    output_dir = "/results"
     os.makedirs(output_dir, exist_ok=True)
     
-    with open(f"{output_dir}/{base_filename}_{args.model_type}_results.json", "w") as f:
-        json.dump(results, f, indent=2)
+    with open(f"{output_dir}/{base_filename}_{model_type}_results.json", "wb") as f:
+        f.write(dumps_json(results, indent=True))
+    return results
+
+def serve(weights_file, model_type):
+    # Keep stdout reserved for JSON replies; anything else goes to stderr
+    replies = sys.stdout
+    sys.stdout = sys.stderr
+    
+    # Load model once and keep it warm for every request
+    predictor = load_predictor(weights_file)
+    
+    for line in sys.stdin:
+        image_path = line.strip()
+        if not image_path:
+            continue
+        try:
+            scores = predictor(process_image(image_path))[0]
+        except Exception as e:
+            reply = {"image": os.path.basename(image_path), "model_type": model_type, "error": str(e)}
+        else:
+            mean_score = float(scores @ _BINS)
+            reply = save_result(image_path, model_type, scores, mean_score)
+        print(dumps_json(reply).decode(), file=replies, flush=True)
+
+def main():
+    args = parse_args()
+    
+    # Let XLA fuse the dense + softmax tail of the network
+    tf.config.optimizer.set_jit(True)
+    
+    if args.server:
+        serve(args.weights_file, args.model_type)
+        return
+    
+    image_paths = collect_image_paths(args)
+    if not image_paths:
+        print("No images to evaluate.")
+        sys.exit(1)
+    
+    # Load model once for all images
+    predictor = load_predictor(args.weights_file)
+    
+    # Process images into a single (N, 224, 224, 3) batch, dropping any
+    # image that cannot be decoded so the rest still get scored
+    images = []
+    readable_paths = []
+    for image_path in image_paths:
+        try:
+            images.append(process_image(image_path)[0])
+        except Exception as e:
+            print(f"Warning: Could not read image '{image_path}', skipping: {e}")
+            continue
+        readable_paths.append(image_path)
+    if not images:
+        print("No readable images to evaluate.")
+        sys.exit(1)
+    image_paths = readable_paths
+    images = np.stack(images)
+    
+    # Make predictions
+    scores_batch, mean_scores = predict(predictor, images, image_paths, args.model_type)
+    
+    # Save results to file
+    for image_path, scores, mean_score in zip(image_paths, scores_batch, mean_scores):
+        save_result(image_path, args.model_type, scores, mean_score)
 
 if __name__ == "__main__":
     main()
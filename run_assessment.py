@@ -9,8 +9,20 @@ import sys
 import argparse
 import subprocess
 import time
-import json
-import glob
+import threading
+from parse_results import iter_results, loads_json, save_index
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+DOCKER_IMAGE = 'tensorflow/tensorflow:2.9.1'
+# Buffer size for the worker pipes; replies are read in large chunks
+PIPE_BUFFER_SIZE = 65536
+MODELS_DIR = 'models/MobileNet'
+MODEL_WEIGHTS = {
+    'aesthetic': 'weights_mobilenet_aesthetic_0.07',
+    'technical': 'weights_mobilenet_technical_0.11',
+}
+# Converted artifacts from convert_model.py load faster than the HDF5 weights
+WEIGHTS_SUFFIXES = ('_int8.tflite', '.tflite', '_savedmodel', '.hdf5')
 
 def parse_args():
     """Parse command line arguments."""
@@ -39,44 +51,93 @@ def run_setup():
         print("setup.sh not found. Make sure you're in the correct directory.")
         sys.exit(1)
 
+def list_images(image_dir):
+    """List the image files to assess in the image directory."""
+    if not os.path.isdir(image_dir):
+        return []
+    return sorted(name for name in os.listdir(image_dir)
+                  if name.lower().endswith(IMAGE_EXTENSIONS))
+
+def resolve_weights(model_type):
+    """Pick the fastest-loading model artifact available for a model type."""
+    for suffix in WEIGHTS_SUFFIXES:
+        weights_name = MODEL_WEIGHTS[model_type] + suffix
+        if os.path.exists(os.path.join(MODELS_DIR, weights_name)):
+            return weights_name
+    return MODEL_WEIGHTS[model_type] + '.hdf5'
+
+def start_predictor(image_dir, model_type):
+    """Start a long-lived predictor worker for one model type."""
+    cmd = [
+        'docker', 'run', '--rm', '-i',
+        '-v', f'{os.path.abspath(image_dir)}:/images',
+        '-v', f'{os.path.abspath(MODELS_DIR)}:/models',
+        '-v', f'{os.path.abspath("results")}:/results',
+        '-v', f'{os.path.abspath("predict_script.py")}:/predict_script.py',
+        DOCKER_IMAGE,
+        'python3', '/predict_script.py', '--server',
+        '--weights-file', f'/models/{resolve_weights(model_type)}',
+        '--model-type', model_type,
+    ]
+    return subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=PIPE_BUFFER_SIZE)
+
+def feed_predictor(process, images):
+    """Write every image path to the worker, then close its input."""
+    try:
+        for image_name in images:
+            process.stdin.write(f"/images/{image_name}\n")
+        process.stdin.close()
+    except BrokenPipeError:
+        # The worker exited early; its exit code is reported by the caller
+        pass
+
 def run_assessment(image_dir, model_type):
-    """Run the assessment script."""
+    """Run the assessment through one predictor worker per model type."""
     print(f"Running assessment for {model_type} model(s) on images in {image_dir}...")
     
-    cmd = ['./assess_images.sh']
-    if model_type != 'both':
-        cmd.append(f'--{model_type}')
-    if image_dir != 'sample_images':
-        cmd.append('--custom')
+    images = list_images(image_dir)
+    if not images:
+        print(f"Error: No images found in {image_dir} directory. Please add your images there.")
+        sys.exit(1)
     
-    try:
-        # Run the assessment script and display output in real-time
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    model_types = ['aesthetic', 'technical'] if model_type == 'both' else [model_type]
+    for current_model in model_types:
+        print(f"\n===== Evaluating {current_model.upper()} quality of images in {image_dir} =====")
         
-        # Display output in real-time
-        while True:
-            output = process.stdout.readline()
-            if output == '' and process.poll() is not None:
-                break
-            if output:
-                print(output.strip())
+        try:
+            process = start_predictor(image_dir, current_model)
+        except FileNotFoundError:
+            print("Error: Docker is not installed or not in PATH. Please install Docker first.")
+            sys.exit(1)
         
-        # Check for errors
-        return_code = process.poll()
-        if return_code != 0:
-            stderr = process.stderr.read()
-            print(f"Error running assessment: {stderr}")
-            sys.exit(return_code)
+        # Feed image paths from a background thread while replies are read
+        # here, so the worker never waits on a round trip between images
+        feeder = threading.Thread(target=feed_predictor, args=(process, images), daemon=True)
+        feeder.start()
         
-        print("Assessment completed successfully.")
+        results = {}
+        for reply in process.stdout:
+            record = loads_json(reply)
+            print(f"\nEvaluating: {record['image']}")
+            if 'error' in record:
+                print(f"Error: {record['error']}")
+            else:
+                print(f"Predicted score: {record['mean_score']:.2f}")
+                results.setdefault(record['image'], {})[current_model] = record['scores']
         
-    except subprocess.CalledProcessError as e:
-        print(f"Error running assessment: {e}")
-        print(f"STDERR: {e.stderr}")
-        sys.exit(1)
-    except FileNotFoundError:
-        print("assess_images.sh not found. Make sure you're in the correct directory.")
-        sys.exit(1)
+        feeder.join()
+        return_code = process.wait()
+        
+        # Index this model's scores before reporting any failure, so results
+        # from earlier models and images stay visible to the visualizer
+        if results:
+            save_index(results)
+        
+        if return_code != 0:
+            print(f"Error running assessment: predictor exited with code {return_code}")
+            sys.exit(return_code)
+    
+    print("Assessment completed successfully.")
 
 def run_visualization(image_dir, model_type):
     """Run the visualization script."""
@@ -107,19 +168,21 @@ def check_results():
     if not os.path.exists(results_dir):
         return False
     
-    # Check for JSON result files
-    json_files = glob.glob(os.path.join(results_dir, "*.json"))
-    return len(json_files) > 0
+    # Check for JSON result files, stopping at the first one found
+    return any(iter_results(results_dir))
 
 def main():
     """Main function."""
     args = parse_args()
     
     # Make script files executable
-    try:
-        subprocess.run(['chmod', '+x', 'setup.sh', 'assess_images.sh'], check=True)
-    except subprocess.CalledProcessError:
-        print("Warning: Could not make scripts executable. You may need to run 'chmod +x setup.sh assess_images.sh' manually.")
+    for script in ('setup.sh', 'assess_images.sh'):
+        try:
+            os.chmod(script, os.stat(script).st_mode | 0o111)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            print(f"Warning: Could not make {script} executable. You may need to run 'chmod +x {script}' manually.")
     
     # Run setup if requested
     if args.setup:
@@ -8,11 +8,49 @@ import os
 import sys
 import argparse
 import json
-import glob
+import mmap
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+import matplotlib
+# Use the non-interactive backend so worker processes never probe for a GUI
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
-from matplotlib.gridspec import GridSpec
+from matplotlib.ticker import FixedLocator
 from PIL import Image
+from parse_results import INDEX_FILE, RESULTS_SUFFIX, iter_results
+
+try:
+    # orjson is a much faster drop-in for the json module when installed
+    import orjson
+except ImportError:
+    orjson = None
+
+# Rating levels the model predicts a distribution over
+_BINS = np.arange(1, 11, dtype=np.float32)
+# Integer bar positions and tick locations for the score plots
+_BIN_IDX = np.arange(1, 11)
+
+# Resolution of the saved visualizations
+SAVE_DPI = 80
+
+# Files smaller than this are read directly; mmap setup costs more than it saves
+MMAP_THRESHOLD = 64 * 1024
+
+# Largest size the image is shown at in the figure
+DISPLAY_SIZE = (800, 800)
+
+# Figure reused across images within one process, see _get_figure()
+_figure = None
+
+def load_json(path):
+    """Load a JSON file, memory-mapping large files so orjson parses them in place."""
+    with open(path, 'rb') as f:
+        if orjson is None:
+            return json.load(f)
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+            return orjson.loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            return orjson.loads(view)
 
 def parse_args():
     """Parse command line arguments."""
@@ -24,73 +62,137 @@ def parse_args():
     parser.add_argument('--model-type', type=str, default='both',
                         choices=['aesthetic', 'technical', 'both'],
                         help='Model type to visualize (default: both)')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-render visualizations even if they are newer than their results')
     return parser.parse_args()
 
 def load_results(results_dir, model_type):
-    """Load results from JSON files in the results directory."""
+    """Load results from the index and JSON files in the results directory."""
     results = {}
+    indexed = set()
+    index_mtime = 0
     
-    # Get all JSON files in the results directory
-    json_files = glob.glob(os.path.join(results_dir, "*.json"))
+    # Start from the consolidated index written by parse_results.py and run_assessment.py
+    index_file = os.path.join(results_dir, INDEX_FILE)
+    if os.path.exists(index_file):
+        index_mtime = os.path.getmtime(index_file)
+        for image_name, models in load_json(index_file).items():
+            for current_model, scores in models.items():
+                indexed.add((os.path.splitext(image_name)[0], current_model))
+                if model_type == 'both' or current_model == model_type:
+                    results.setdefault(image_name, {})[current_model] = scores
     
-    for json_file in json_files:
-        # Load the JSON data
-        with open(json_file, 'r') as f:
-            data = json.load(f)
+    # Per-image result files are only read when the index lacks them or they
+    # are newer than it, e.g. after running assess_images.sh directly
+    for json_file in iter_results(results_dir):
+        name = os.path.basename(json_file)
+        if not name.endswith(RESULTS_SUFFIX):
+            continue
+        
+        stem, _, file_model = name[:-len(RESULTS_SUFFIX)].rpartition('_')
         
         # Skip if model type doesn't match
-        if model_type != 'both' and data['model_type'] != model_type:
+        if model_type != 'both' and file_model != model_type:
+            continue
+        
+        # Skip if the index already holds these scores
+        if (stem, file_model) in indexed and os.path.getmtime(json_file) <= index_mtime:
             continue
         
-        image_name = data['image']
+        # Load the JSON data
+        data = load_json(json_file)
         
-        # Initialize image entry if it doesn't exist
-        if image_name not in results:
-            results[image_name] = {}
+        # Skip files that are not per-model prediction results
+        if 'model_type' not in data:
+            continue
         
         # Add the scores
-        results[image_name][data['model_type']] = data['scores']
+        results.setdefault(data['image'], {})[data['model_type']] = data['scores']
     
     return results
 
+def _mean_std(scores):
+    """Calculate mean and standard deviation of scores together."""
+    score_array = np.asarray(scores, dtype=np.float32)
+    mean = float(score_array @ _BINS)
+    std = float(np.sqrt(score_array @ (_BINS - mean) ** 2))
+    return mean, std
+
 def calculate_mean_score(scores):
     """Calculate mean score from probability distribution."""
-    score_array = np.array(scores)
-    return float(np.sum(score_array * np.arange(1, 11)))
+    return float(np.asarray(scores, dtype=np.float32) @ _BINS)
 
 def calculate_std_score(scores):
     """Calculate standard deviation of scores."""
-    score_array = np.array(scores)
-    mean = calculate_mean_score(scores)
-    return float(np.sqrt(np.sum(score_array * np.square(np.arange(1, 11) - mean))))
+    return _mean_std(scores)[1]
 
 def plot_score_distribution(ax, scores, title, color):
     """Plot the score distribution as a bar chart."""
-    mean = calculate_mean_score(scores)
-    std = calculate_std_score(scores)
+    mean, std = _mean_std(scores)
     
-    bars = ax.bar(np.arange(1, 11), scores, alpha=0.7, color=color)
+    ax.bar(_BIN_IDX, scores, width=0.8, color=color, alpha=0.7, edgecolor='none')
     ax.axvline(mean, color='red', linestyle='--', alpha=0.8, label=f'Mean: {mean:.2f}')
     ax.set_title(f"{title}\nMean: {mean:.2f}, Std: {std:.2f}")
     ax.set_xlabel('Score')
     ax.set_ylabel('Probability')
-    ax.set_xticks(np.arange(1, 11))
+    ax.xaxis.set_major_locator(FixedLocator(_BIN_IDX))
     ax.grid(axis='y', alpha=0.3)
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
     return mean, std
 
-def visualize_image(image_path, aesthetic_scores=None, technical_scores=None, output_dir='results'):
-    """Visualize the image and its quality scores."""
-    fig = plt.figure(figsize=(12, 8))
+def output_path(image_path, output_dir, aesthetic_scores=None, technical_scores=None):
+    """Return the path of the visualization rendered for an image.
     
+    Figures showing a single model's scores carry the model type in their name,
+    so they never stand in for a figure with a different layout.
+    """
+    stem = os.path.splitext(os.path.basename(image_path))[0]
     if aesthetic_scores is not None and technical_scores is not None:
-        gs = GridSpec(2, 2, width_ratios=[2, 1])
+        return os.path.join(output_dir, f"{stem}_scores.png")
+    model = 'aesthetic' if aesthetic_scores is not None else 'technical'
+    return os.path.join(output_dir, f"{stem}_{model}_scores.png")
+
+def result_sources(results_dir, image_path, scores_dict):
+    """List the files an image's visualization is rendered from."""
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    sources = [os.path.join(results_dir, INDEX_FILE)]
+    sources += [os.path.join(results_dir, f"{stem}_{model}{RESULTS_SUFFIX}") for model in scores_dict]
+    return [image_path] + [source for source in sources if os.path.exists(source)]
+
+def is_up_to_date(output_file, sources):
+    """Check whether the output file is newer than all of its sources."""
+    if not os.path.exists(output_file):
+        return False
+    output_mtime = os.path.getmtime(output_file)
+    return all(os.path.getmtime(source) <= output_mtime for source in sources)
+
+def visualize_image(image_path, aesthetic_scores=None, technical_scores=None, output_dir='results', fig=None):
+    """Visualize the image and its quality scores.
+    
+    If a figure is given it is cleared and reused instead of creating a new one.
+    """
+    owns_figure = fig is None
+    if owns_figure:
+        fig = plt.figure(figsize=(12, 8))
+    else:
+        fig.clear()
+    
+    # Decode the image once at display resolution; draft() lets libjpeg
+    # downscale while decoding large JPEGs
+    with Image.open(image_path) as img:
+        img.draft('RGB', (DISPLAY_SIZE[0] * 2, DISPLAY_SIZE[1] * 2))
+        img.thumbnail(DISPLAY_SIZE, Image.BILINEAR)
+        pixels = np.asarray(img)
+    
+    if aesthetic_scores is not None and technical_scores is not None:
+        gs = fig.add_gridspec(2, 2, width_ratios=[2, 1])
         ax_img = fig.add_subplot(gs[:, 0])
         ax_aesthetic = fig.add_subplot(gs[0, 1])
         ax_technical = fig.add_subplot(gs[1, 1])
         
         # Plot image
-        img = Image.open(image_path)
-        ax_img.imshow(img)
+        ax_img.imshow(pixels, interpolation='nearest')
         ax_img.set_title(os.path.basename(image_path))
         ax_img.axis('off')
         
@@ -107,13 +209,12 @@ def visualize_image(image_path, aesthetic_scores=None, technical_scores=None, ou
                    bbox=dict(facecolor='white', alpha=0.8, boxstyle='round,pad=0.5'))
     
     elif aesthetic_scores is not None:
-        gs = GridSpec(1, 2, width_ratios=[2, 1])
+        gs = fig.add_gridspec(1, 2, width_ratios=[2, 1])
         ax_img = fig.add_subplot(gs[0, 0])
         ax_aesthetic = fig.add_subplot(gs[0, 1])
         
         # Plot image
-        img = Image.open(image_path)
-        ax_img.imshow(img)
+        ax_img.imshow(pixels, interpolation='nearest')
         ax_img.set_title(os.path.basename(image_path))
         ax_img.axis('off')
         
@@ -128,13 +229,12 @@ def visualize_image(image_path, aesthetic_scores=None, technical_scores=None, ou
                    bbox=dict(facecolor='white', alpha=0.8, boxstyle='round,pad=0.5'))
     
     elif technical_scores is not None:
-        gs = GridSpec(1, 2, width_ratios=[2, 1])
+        gs = fig.add_gridspec(1, 2, width_ratios=[2, 1])
         ax_img = fig.add_subplot(gs[0, 0])
         ax_technical = fig.add_subplot(gs[0, 1])
         
         # Plot image
-        img = Image.open(image_path)
-        ax_img.imshow(img)
+        ax_img.imshow(pixels, interpolation='nearest')
         ax_img.set_title(os.path.basename(image_path))
         ax_img.axis('off')
         
@@ -148,13 +248,27 @@ def visualize_image(image_path, aesthetic_scores=None, technical_scores=None, ou
                    ha='center',
                    bbox=dict(facecolor='white', alpha=0.8, boxstyle='round,pad=0.5'))
     
-    plt.tight_layout()
+    fig.tight_layout()
     
     # Save the figure
-    output_file = os.path.join(output_dir, f"{os.path.splitext(os.path.basename(image_path))[0]}_scores.png")
-    plt.savefig(output_file)
+    output_file = output_path(image_path, output_dir, aesthetic_scores, technical_scores)
+    fig.savefig(output_file, dpi=SAVE_DPI, bbox_inches=None,
+                pil_kwargs={"compress_level": 1, "optimize": False})
     print(f"Saved visualization to {output_file}")
-    plt.close()
+    if owns_figure:
+        plt.close(fig)
+
+def _get_figure():
+    """Return the figure reused for every image rendered by this process."""
+    global _figure
+    if _figure is None:
+        _figure = plt.figure(figsize=(12, 8))
+    return _figure
+
+def _visualize_one(task):
+    """Visualize a single (image_path, aesthetic, technical, output_dir) task."""
+    image_path, aesthetic_scores, technical_scores, output_dir = task
+    visualize_image(image_path, aesthetic_scores, technical_scores, output_dir=output_dir, fig=_get_figure())
 
 def main():
     """Main function."""
@@ -178,7 +292,8 @@ def main():
         print(f"Error: Directory '{image_dir}' does not exist.")
         sys.exit(1)
     
-    # Process each image
+    # Collect the images to visualize
+    tasks = []
     for image_name, scores_dict in results.items():
         # Find the image file
         image_path = os.path.join(image_dir, image_name)
@@ -186,19 +301,24 @@ def main():
             print(f"Warning: Image file '{image_path}' not found, skipping visualization.")
             continue
         
-        print(f"Processing: {image_name}")
-        
         # Get scores
         aesthetic_scores = scores_dict.get('aesthetic')
         technical_scores = scores_dict.get('technical')
         
-        # Visualize
-        visualize_image(
-            image_path, 
-            aesthetic_scores, 
-            technical_scores,
-            output_dir=args.results_dir
-        )
+        # Skip images whose visualization is newer than their results
+        output_file = output_path(image_path, args.results_dir, aesthetic_scores, technical_scores)
+        sources = result_sources(args.results_dir, image_path, scores_dict)
+        if not args.force and is_up_to_date(output_file, sources):
+            print(f"Skipping: {image_name} (visualization is up to date)")
+            continue
+        
+        print(f"Processing: {image_name}")
+        
+        tasks.append((image_path, aesthetic_scores, technical_scores, args.results_dir))
+    
+    # Render the figures in parallel, one image per task
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        list(executor.map(_visualize_one, tasks))
     
     print("\nVisualization complete! Check the 'results' directory for output images.")
 